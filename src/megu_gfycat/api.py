@@ -4,24 +4,52 @@
 
 """Contains the functionality for fetching content via the Gfycat API."""
 
+import hashlib
 import json
-from datetime import datetime
-from typing import Dict, Generator, List, Optional, TypedDict
-
+import mmap
+import os
+import struct
+import tempfile
+import time
+from contextlib import contextmanager, suppress
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Generator, List, NamedTuple, Optional, Tuple, TypedDict
+
+from appdirs import user_cache_dir
 from megu import Content, HttpMethod, HttpResource, Meta, Url
-from megu.helpers import disk_cache, http_session
+from megu.helpers import http_session
 from megu.log import instance as log
+from requests import Session
+from requests.adapters import HTTPAdapter
+
+try:
+    from orjson import loads as json_loads
+except ImportError:  # pragma: no cover
+    from json import loads as json_loads
 
 from .constants import CONTENT_ENTRIES, GFYCAT_URL_TEMPLATE
 from .utils import build_content_id, get_gfycat_id
 
-DISK_CACHE_NAME = "megu_gfycat"
-DISK_CACHE_KEY = "bearer_token"
+# Bearer token file layout: little-endian u64 expiry epoch and the SHA-256 digest of
+# the client id the token belongs to, followed by the token bytes, NUL padded to a
+# fixed size
+TOKEN_FILE_PATH = Path(user_cache_dir("megu_gfycat"), "token")
+TOKEN_FILE_SIZE = 256
+TOKEN_FILE_HEADER = struct.Struct("<Q32s")
 
 API_URL_BASE = "https://api.gfycat.com/v1/"
 API_URL_DATA = API_URL_BASE + "gfycats/"
 API_URL_AUTH = API_URL_BASE + "oauth/token/"
 
+# Default lifetime of a bearer token (from Gfycat's docs) and the margin we subtract
+# from it to avoid using a token that is just about to expire
+TOKEN_EXPIRES_IN = 3600
+TOKEN_EXPIRY_MARGIN = 60
+
+# In-process cache of (client_id, client_secret) to (bearer_token, monotonic expiry)
+_TOKEN_CACHE: Dict[Tuple[str, str], Tuple[str, float]] = {}
+
 
 class GfycatContent(TypedDict):
     """Describes the API payload dictionary for some Gfycat content."""
@@ -88,6 +116,41 @@ class GfycatResponse(TypedDict):
     gfyItem: GfycatItem
 
 
+class GfycatItemLite(NamedTuple):
+    """Describes only the fields of a Gfycat item that we actually use."""
+
+    gfyId: str
+    gfyName: str
+    description: str
+    username: str
+    createDate: int
+    posterUrl: str
+    content_urls: Dict[str, GfycatContent]
+
+    @classmethod
+    def from_item(cls, gfycat_item: GfycatItem) -> "GfycatItemLite":
+        """Project the fields we use out of a full Gfycat item payload.
+
+        Args:
+            gfycat_item (GfycatItem):
+                The Gfycat item API payload.
+
+        Returns:
+            GfycatItemLite:
+                The projected Gfycat item.
+        """
+
+        return cls(
+            gfyId=gfycat_item["gfyId"],
+            gfyName=gfycat_item["gfyName"],
+            description=gfycat_item["description"],
+            username=gfycat_item["username"],
+            createDate=gfycat_item["createDate"],
+            posterUrl=gfycat_item["posterUrl"],
+            content_urls=gfycat_item["content_urls"],
+        )
+
+
 class AuthResponse(TypedDict):
     """Descibes the API payload for a sucessful Gfycat OAuth token response."""
 
@@ -97,7 +160,116 @@ class AuthResponse(TypedDict):
     access_token: str
 
 
-def get_auth_response(token: str, secret: str) -> AuthResponse:
+@contextmanager
+def _session_context(
+    session: Optional[Session] = None,
+) -> Generator[Session, None, None]:
+    """Reuse the given session or open a new HTTP session for the context.
+
+    Args:
+        session (Optional[~requests.Session], optional):
+            The session to reuse, if provided. Defaults to None.
+
+    Yields:
+        ~requests.Session:
+            The session to make requests with.
+    """
+
+    if session is not None:
+        yield session
+        return
+
+    with http_session() as new_session:
+        yield new_session
+
+
+def _get_client_digest(token: str) -> bytes:
+    """Get the digest identifying the client a persisted bearer token belongs to.
+
+    Args:
+        token (str):
+            The "client_id" for the registered Gfycat application.
+
+    Returns:
+        bytes:
+            The SHA-256 digest of the client id.
+    """
+
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+
+def _read_token_file(token: str) -> Optional[Tuple[str, float]]:
+    """Read the persisted bearer token if it exists and hasn't expired.
+
+    Args:
+        token (str):
+            The "client_id" the persisted bearer token must belong to.
+
+    Returns:
+        Optional[Tuple[str, float]]:
+            A tuple of the (bearer_token, expire_time) if available.
+    """
+
+    try:
+        with TOKEN_FILE_PATH.open("rb") as file_io, mmap.mmap(
+            file_io.fileno(), TOKEN_FILE_SIZE, access=mmap.ACCESS_READ
+        ) as token_map:
+            expire_time, client_digest = TOKEN_FILE_HEADER.unpack_from(token_map)
+            bearer_token = (
+                token_map[TOKEN_FILE_HEADER.size :].rstrip(b"\x00").decode("utf-8")
+            )
+    except (OSError, ValueError):
+        # NOTE: UnicodeDecodeError from a corrupt token file is also a ValueError
+        return None
+
+    if client_digest != _get_client_digest(token):
+        return None
+
+    if not bearer_token or time.time() >= expire_time - TOKEN_EXPIRY_MARGIN:
+        return None
+
+    return (bearer_token, float(expire_time))
+
+
+def _write_token_file(token: str, bearer_token: str, expire_time: float) -> None:
+    """Atomically persist the bearer token for other processes to reuse.
+
+    Persisting the token is best-effort, failures are logged and otherwise ignored.
+
+    Args:
+        token (str):
+            The "client_id" the bearer token belongs to.
+        bearer_token (str):
+            The bearer token to persist.
+        expire_time (float):
+            The epoch timestamp the bearer token expires at.
+    """
+
+    payload = TOKEN_FILE_HEADER.pack(int(expire_time), _get_client_digest(token))
+    payload += bearer_token.encode("utf-8")
+    if len(payload) > TOKEN_FILE_SIZE:
+        log.warning(
+            "OAuth token is too long to persist to {}, skipping", TOKEN_FILE_PATH
+        )
+        return
+
+    temp_path: Optional[str] = None
+    try:
+        TOKEN_FILE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        temp_fd, temp_path = tempfile.mkstemp(dir=TOKEN_FILE_PATH.parent)
+        with os.fdopen(temp_fd, "wb") as file_io:
+            file_io.write(payload.ljust(TOKEN_FILE_SIZE, b"\x00"))
+        os.replace(temp_path, TOKEN_FILE_PATH)
+    except OSError as exc:
+        log.warning("Failed to persist OAuth token to {}, {!r}", TOKEN_FILE_PATH, exc)
+        if temp_path is not None:
+            with suppress(OSError):
+                os.unlink(temp_path)
+
+
+def get_auth_response(
+    token: str, secret: str, session: Optional[Session] = None
+) -> AuthResponse:
     """Request an OAuth bearer token.
 
     Args:
@@ -105,6 +277,9 @@ def get_auth_response(token: str, secret: str) -> AuthResponse:
             The "client_id" for the registered Gfycat application.
         secret (str):
             The "client_secret" for the registered Gfycat application.
+        session (Optional[~requests.Session], optional):
+            The session to make the request with. Defaults to None which opens a
+            new session.
 
     Raises:
         ValueError:
@@ -115,8 +290,8 @@ def get_auth_response(token: str, secret: str) -> AuthResponse:
             The successful response payload of the auth request.
     """
 
-    with http_session() as session:
-        log.debug(f"Fetching OAuth token response for client {token!r}")
+    with _session_context(session) as session:
+        log.debug("Fetching OAuth token response for client {!r}", token)
         response = session.post(
             API_URL_AUTH,
             json.dumps(
@@ -134,11 +309,11 @@ def get_auth_response(token: str, secret: str) -> AuthResponse:
                 f"failed response {response!r}"
             )
 
-        data: AuthResponse = response.json()
+        data: AuthResponse = json_loads(response.content)
         return data
 
 
-def get_bearer_token(token: str, secret: str) -> str:
+def get_bearer_token(token: str, secret: str, session: Optional[Session] = None) -> str:
     """Fetch the OAuth bearer token to use for requests.
 
     Args:
@@ -146,6 +321,9 @@ def get_bearer_token(token: str, secret: str) -> str:
             The "client_id" for the registered Gfycat application.
         secret (str):
             The "client_secret" for the registered Gfycat application.
+        session (Optional[~requests.Session], optional):
+            The session to request a new bearer token with. Defaults to None which
+            opens a new session.
 
     Raises:
         ValueError:
@@ -156,40 +334,47 @@ def get_bearer_token(token: str, secret: str) -> str:
             The bearer token to use for further Gfycat requests.
     """
 
-    with disk_cache(DISK_CACHE_NAME) as cache:
-        bearer_token = cache.get(DISK_CACHE_KEY, default=None)
-        if bearer_token is not None:
-            log.debug(
-                f"Using cached OAuth token from {DISK_CACHE_KEY!r} in cache "
-                f"{cache.directory}"
-            )
-            return bearer_token
+    cached = _TOKEN_CACHE.get((token, secret))
+    if cached is not None and time.monotonic() < cached[1]:
+        return cached[0]
 
-        auth_response = get_auth_response(token, secret)
-        bearer_token = auth_response["access_token"]
-        if not bearer_token:
-            raise ValueError(
-                f"Request for bearer token to {API_URL_AUTH} returned invalid payload "
-                f"{auth_response!r}"
-            )
-
-        log.debug(
-            f"Fetched OAuth token for client {token!r}, caching under "
-            f"{DISK_CACHE_KEY!r} in cache {cache.directory}"
-        )
-
-        # HACK: probably deprecated by now, but we've seen instances where `expires_in`
-        # doesn't come through the payload all the time.
-        # Defaulting to 3600 (from Gfycat's docs) which we are just assuming is safe.
-        cache.set(
-            DISK_CACHE_KEY,
+    persisted = _read_token_file(token)
+    if persisted is not None:
+        bearer_token, expire_time = persisted
+        log.debug("Using persisted OAuth token from {}", TOKEN_FILE_PATH)
+        _TOKEN_CACHE[(token, secret)] = (
             bearer_token,
-            expire=auth_response.get("expires_in", 3600),
+            time.monotonic() + expire_time - time.time() - TOKEN_EXPIRY_MARGIN,
         )
         return bearer_token
 
+    auth_response = get_auth_response(token, secret, session=session)
+    bearer_token = auth_response["access_token"]
+    if not bearer_token:
+        raise ValueError(
+            f"Request for bearer token to {API_URL_AUTH} returned invalid payload "
+            f"{auth_response!r}"
+        )
+
+    log.debug(
+        "Fetched OAuth token for client {!r}, persisting to {}", token, TOKEN_FILE_PATH
+    )
+
+    # HACK: probably deprecated by now, but we've seen instances where `expires_in`
+    # doesn't come through the payload all the time.
+    # Defaulting to 3600 (from Gfycat's docs) which we are just assuming is safe.
+    expires_in = auth_response.get("expires_in", TOKEN_EXPIRES_IN)
+    _write_token_file(token, bearer_token, time.time() + expires_in)
+    _TOKEN_CACHE[(token, secret)] = (
+        bearer_token,
+        time.monotonic() + expires_in - TOKEN_EXPIRY_MARGIN,
+    )
+    return bearer_token
+
 
-def get_gfycat_response(gfycat_id: str, token: str, secret: str) -> GfycatResponse:
+def get_gfycat_response(
+    gfycat_id: str, token: str, secret: str, session: Optional[Session] = None
+) -> GfycatResponse:
     """Request the Gfycat data for a given Gfycat item ID.
 
     Args:
@@ -199,6 +384,9 @@ def get_gfycat_response(gfycat_id: str, token: str, secret: str) -> GfycatRespon
             The "client_id" for the registered Gfycat application.
         secret (str):
             The "client_secret" for the registered Gfycat application.
+        session (Optional[~requests.Session], optional):
+            The session to make the requests with. Defaults to None which opens a
+            new session.
 
     Raises:
         ValueError:
@@ -210,20 +398,22 @@ def get_gfycat_response(gfycat_id: str, token: str, secret: str) -> GfycatRespon
     """
 
     gfycat_url = API_URL_DATA + gfycat_id
-    with http_session() as session:
-        session.headers.update(
-            {"Authorization": f"Bearer {get_bearer_token(token, secret)!s}"}
-        )
+    with _session_context(session) as session:
+        bearer_token = get_bearer_token(token, secret, session=session)
 
-        log.debug(f"Fetching gfycat data from {gfycat_url!r} using client {token!r}")
-        response = session.get(gfycat_url)
+        log.debug(
+            "Fetching gfycat data from {!r} using client {!r}", gfycat_url, token
+        )
+        response = session.get(
+            gfycat_url, headers={"Authorization": f"Bearer {bearer_token!s}"}
+        )
         if not response.ok:
             raise ValueError(
                 f"Request for gfycat item {gfycat_id!r} resolved to failed response "
                 f"{response!r}"
             )
 
-        data: GfycatResponse = response.json()
+        data: GfycatResponse = json_loads(response.content)
         if "error" in data:
             raise ValueError(
                 f"Request for gfycat item {gfycat_id!r} returned invalid payload "
@@ -246,37 +436,46 @@ def iter_content(url: Url, token: str, secret: str) -> Generator[Content, None,
 
     Yields:
         ~megu.Content:
-            Content pulled from the Gfycat API.
+            Content pulled from the Gfycat API, in the order of ``CONTENT_ENTRIES``.
     """
 
     gfycat_id = get_gfycat_id(url)
-    gfycat_response = get_gfycat_response(gfycat_id, token, secret)
+    with http_session() as session:
+        # both the OAuth and data requests go to the same API host, so we can share a
+        # single kept-alive connection between them
+        session.mount(API_URL_BASE, HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        gfycat_response = get_gfycat_response(gfycat_id, token, secret, session=session)
+
+    # only keep the fields we need so the full payload can be released
+    gfycat_item = GfycatItemLite.from_item(gfycat_response["gfyItem"])
+    del gfycat_response
 
-    gfycat_item = gfycat_response["gfyItem"]
-    gfycat_url = GFYCAT_URL_TEMPLATE.format(id=gfycat_item["gfyId"])
+    extra = {"content_urls": gfycat_item.content_urls}
+    gfycat_url = GFYCAT_URL_TEMPLATE.format(id=gfycat_item.gfyId)
 
     meta = Meta(
-        id=gfycat_item["gfyId"],
-        description=gfycat_item["description"],
-        publisher=gfycat_item["username"],
-        published_at=datetime.fromtimestamp(gfycat_item["createDate"]),
-        thumbnail=gfycat_item["posterUrl"],
+        id=gfycat_item.gfyId,
+        description=gfycat_item.description,
+        publisher=gfycat_item.username,
+        published_at=datetime.fromtimestamp(gfycat_item.createDate, tz=timezone.utc),
+        thumbnail=gfycat_item.posterUrl,
     )
 
-    gfycat_content = gfycat_item["content_urls"]
+    content_id = build_content_id(gfycat_item.gfyName)
     for content_entry in CONTENT_ENTRIES:
-        if content_entry.type in gfycat_content:
-            data = gfycat_content[content_entry.type]
-
-            yield Content(
-                id=build_content_id(gfycat_item["gfyName"]),
-                name=content_entry.name,
-                url=gfycat_url,
-                size=data["size"],
-                type=content_entry.mimetype,
-                extension=content_entry.extension,
-                quality=content_entry.quality,
-                resources=[HttpResource(method=HttpMethod.GET, url=data["url"])],
-                meta=meta,
-                extra=gfycat_response,
-            )
+        data = gfycat_item.content_urls.get(content_entry.type)
+        if data is None:
+            continue
+
+        yield Content(
+            id=content_id,
+            name=content_entry.name,
+            url=gfycat_url,
+            size=data["size"],
+            type=content_entry.mimetype,
+            extension=content_entry.extension,
+            quality=content_entry.quality,
+            resources=[HttpResource(method=HttpMethod.GET, url=data["url"])],
+            meta=meta,
+            extra=extra,
+        )
@@ -5,36 +5,114 @@
 """Contains constants used through multiple places within the package."""
 
 import re
-from typing import List, NamedTuple, Pattern, Set
+import sys
+from dataclasses import dataclass, fields
+from typing import Any, Dict, FrozenSet, List
 
 # Optional environment configuration names
 ENV_API_ENABLED = "MEGU_GFYCAT_API_ENABLED"
 ENV_API_TOKEN = "MEGU_GFYCAT_API_TOKEN"
 ENV_API_SECRET = "MEGU_GFYCAT_API_SECRET"
 
-# URL patterns that we know how to handle
+# Case-insensitive environment values that we consider truthy
+TRUTHY_VALUES: FrozenSet[str] = frozenset({"1", "true", "yes", "on"})
+
+# URL patterns that we know how to handle (intended to be used with ``fullmatch``)
 BASIC_PATTERN = re.compile(
-    r"^https:?://(?:www\.)?gfycat\.com/(?:gifs/detail)?"
-    r"(?P<id>[a-zA-Z]+)[a-zA-Z0-9-]*/?$"
+    r"https:?://(?:www\.)?gfycat\.com/(?:gifs/detail)?"
+    r"(?P<id>[a-zA-Z]+)[a-zA-Z0-9-]*/?"
 )
 RAW_PATTERN = re.compile(
-    r"^https:?://[a-z]+\.gfycat\.com/(?P<id>[a-zA-Z]+)[a-zA-Z0-9_-]*\.[a-zA-Z0-9]+$"
+    r"https:?://[a-z]+\.gfycat\.com/(?P<id>[a-zA-Z]+)[a-zA-Z0-9_-]*\.[a-zA-Z0-9]+"
+)
+
+# Single alternation of the known URL patterns, matched in one pass
+# (each ``id`` group is renamed as group names must be unique within a pattern)
+URL_PATTERN = re.compile(
+    "|".join(
+        "(?:" + pattern.pattern.replace("(?P<id>", f"(?P<{group_name}>") + ")"
+        for group_name, pattern in [
+            ("basic_id", BASIC_PATTERN),
+            ("raw_id", RAW_PATTERN),
+        ]
+    )
 )
-VALID_PATTERNS: Set[Pattern] = {BASIC_PATTERN, RAW_PATTERN}
+assert {"basic_id", "raw_id"} <= URL_PATTERN.groupindex.keys(), (
+    "BASIC_PATTERN and RAW_PATTERN must each have exactly one named id group"
+)
+
+# Maximum number of URLs to extract concurrently when extracting many URLs
+DEFAULT_MAX_WORKERS = 8
 
 # Template for producing very basic Gfycat source URLs
 GFYCAT_URL_TEMPLATE = "https://gfycat.com/{id!s}"
 
 
-class ContentEntry(NamedTuple):
+@dataclass(frozen=True)
+class ContentEntry:
     """Helps describe a content entry that we want to extract from Gfycat."""
 
+    # NOTE: written by hand as ``dataclass(slots=True)`` isn't available on Python 3.9;
+    # this must be kept in sync with the fields declared below
+    __slots__ = (
+        "name",
+        "type",
+        "extension",
+        "mimetype",
+        "quality",
+        "url_prefix",
+        "url_suffix",
+    )
+
     name: str
     type: str
     extension: str
     mimetype: str
     quality: float
-    url_template: str
+    url_prefix: str
+    url_suffix: str
+
+    def __post_init__(self) -> None:
+        """Intern the content type so lookups against payload keys are cheaper."""
+
+        object.__setattr__(self, "type", sys.intern(self.type))
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """Get the state of the content entry for copying and pickling.
+
+        Returns:
+            Dict[str, Any]:
+                The field values of the content entry keyed by field name.
+        """
+
+        return {field.name: getattr(self, field.name) for field in fields(self)}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        """Restore the state of the frozen content entry when copying and unpickling.
+
+        Args:
+            state (Dict[str, Any]):
+                The state previously returned by :meth:`__getstate__`.
+        """
+
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+
+        object.__setattr__(self, "type", sys.intern(self.type))
+
+    def build_url(self, gfycat_id: str) -> str:
+        """Build the content URL for the given gfycat id.
+
+        Args:
+            gfycat_id (str):
+                The ID of the gfycat content.
+
+        Returns:
+            str:
+                The URL of the content entry for the given gfycat id.
+        """
+
+        return self.url_prefix + gfycat_id + self.url_suffix
 
 
 CONTENT_ENTRIES: List[ContentEntry] = [
@@ -44,7 +122,8 @@ CONTENT_ENTRIES: List[ContentEntry] = [
         extension=".mp4",
         mimetype="video/mp4",
         quality=1.0,
-        url_template="https://giant.gfycat.com/{id}.mp4",
+        url_prefix="https://giant.gfycat.com/",
+        url_suffix=".mp4",
     ),
     ContentEntry(
         name="WEBM Video",
@@ -52,7 +131,8 @@ CONTENT_ENTRIES: List[ContentEntry] = [
         extension=".webm",
         mimetype="video/webm",
         quality=0.5,
-        url_template="https://giant.gfycat.com/{id}.webm",
+        url_prefix="https://giant.gfycat.com/",
+        url_suffix=".webm",
     ),
     ContentEntry(
         name="5MB Gif Image",
@@ -60,7 +140,8 @@ CONTENT_ENTRIES: List[ContentEntry] = [
         extension=".gif",
         mimetype="image/gif",
         quality=0.25,
-        url_template="https://thumbs.gfycat.com/{id}-size_restricted.gif",
+        url_prefix="https://thumbs.gfycat.com/",
+        url_suffix="-size_restricted.gif",
     ),
     ContentEntry(
         name="2MB Gif Image",
@@ -68,7 +149,8 @@ CONTENT_ENTRIES: List[ContentEntry] = [
         extension=".gif",
         mimetype="image/gif",
         quality=0.10,
-        url_template="https://thumbs.gfycat.com/{id}-small.gif",
+        url_prefix="https://thumbs.gfycat.com/",
+        url_suffix="-small.gif",
     ),
     ContentEntry(
         name="1MB Gift Image",
@@ -76,6 +158,10 @@ CONTENT_ENTRIES: List[ContentEntry] = [
         extension=".gif",
         mimetype="image/gif",
         quality=0.05,
-        url_template="https://thumbs.gfycat.com/{id}-max-1mb.gif",
+        url_prefix="https://thumbs.gfycat.com/",
+        url_suffix="-max-1mb.gif",
     ),
 ]
+
+# Content types Gfycat always serves, which we don't need to verify exist
+ALWAYS_AVAILABLE_TYPES: FrozenSet[str] = frozenset({"mp4", "webm"})
@@ -4,14 +4,17 @@
 
 """Contains the functionality for guessing content endpoints."""
 
+from concurrent.futures import ThreadPoolExecutor
 from typing import Generator
 
+from lxml import etree, html
 from megu import Content, HttpMethod, HttpResource, Meta, Url
-from megu.helpers import get_soup, http_session
+from megu.helpers import http_session
 from megu.log import instance as log
+from requests.adapters import HTTPAdapter
 
-from .constants import CONTENT_ENTRIES
-from .utils import build_content_id, get_gfycat_id
+from .constants import ALWAYS_AVAILABLE_TYPES, CONTENT_ENTRIES, ContentEntry
+from .utils import build_content_id
 
 
 def find_gfycat_id(url: Url) -> str:
@@ -33,6 +36,8 @@ def find_gfycat_id(url: Url) -> str:
     Raises:
         ValueError:
             If the request for page content fails.
+        ValueError:
+            If the page content could not be parsed as HTML.
         ValueError:
             If the main video element could not be found on the page DOM.
         ValueError:
@@ -47,7 +52,7 @@ def find_gfycat_id(url: Url) -> str:
     """
 
     with http_session() as session:
-        log.debug(f"Fetching HTML page content from {url}")
+        log.debug("Fetching HTML page content from {}", url)
         response = session.get(url.url)
         if not response.ok:
             raise ValueError(
@@ -55,14 +60,22 @@ def find_gfycat_id(url: Url) -> str:
                 f"{response!r}"
             )
 
-        soup = get_soup(response.text)
-        log.debug(f"Looking for main video element on HTML page content from {url}")
-        video_element = soup.find("video", {"class": "video media"})
-        if not video_element:
+        try:
+            document = html.fromstring(response.content)
+        except etree.ParserError as exc:
+            raise ValueError(
+                f"Could not parse site content at {url} from response {response!r}"
+            ) from exc
+
+        log.debug("Looking for main video element on HTML page content from {}", url)
+        video_elements = document.xpath('//video[contains(@class, "video media")]')
+        if not video_elements:
             raise ValueError(f"Could not find video element in the page from {url}")
 
+        video_element = video_elements[0]
+
         log.debug(
-            f"Extracting the poster URL from the discovered video element from {url}"
+            "Extracting the poster URL from the discovered video element from {}", url
         )
         video_poster = video_element.get("poster")
         if not video_poster:
@@ -70,17 +83,29 @@ def find_gfycat_id(url: Url) -> str:
                 f"Could not fetch video poster from the video element {video_element!r}"
             )
 
-        log.debug(f"Extracting the internal gfycat ID from the poster url from {url}")
-        video_poster_url = Url(video_poster)
-        return get_gfycat_id(video_poster_url)
+        log.debug("Extracting the internal gfycat ID from the poster url from {}", url)
+        poster_name = video_poster.split("?", 1)[0].rsplit("/", 1)[-1]
+        gfycat_id = poster_name.split("-", 1)[0].split(".", 1)[0]
+        if not gfycat_id:
+            raise ValueError(f"Provided poster url {video_poster!r} has no gfycat id")
+
+        return gfycat_id
 
 
 def iter_content(url: Url) -> Generator[Content, None, None]:
     """Iterate over the content we know should likely exist.
 
     .. note::
-        For each guessed content entry, we are making a HEAD request to determine
-        existence and content size.
+        Content types that Gfycat always serves (see
+        :data:`~.constants.ALWAYS_AVAILABLE_TYPES`) are yielded without verification
+        and with an unknown size of 0. For each of the other guessed content entries,
+        we are making a HEAD request to determine existence and content size.
+        These requests are issued concurrently.
+
+    .. warning::
+        The gfycat ID is itself only guessed from the page's poster URL. As the
+        always available content is not verified, a wrong ID produces MP4 and WEBM
+        content whose resources resolve to a 404.
 
     Args:
         url (~megu.Url):
@@ -88,31 +113,63 @@ def iter_content(url: Url) -> Generator[Content, None, None]:
 
     Yields:
         ~megu.Content:
-            The content that we have guessed and verified exists.
+            The content that we have guessed. Only the optional content entries have
+            been verified to exist, the always available content is unverified.
     """
 
     gfycat_id = find_gfycat_id(url)
     gfycat_meta = Meta(id=gfycat_id)
+    content_id = build_content_id(gfycat_id)
+
+    def _build_content(content_entry: ContentEntry, size: int) -> Content:
+        return Content(
+            id=content_id,
+            name=content_entry.name,
+            url=url.url,
+            size=size,
+            type=content_entry.mimetype,
+            extension=content_entry.extension,
+            quality=content_entry.quality,
+            resources=[
+                HttpResource(
+                    method=HttpMethod.GET, url=content_entry.build_url(gfycat_id)
+                )
+            ],
+            meta=gfycat_meta,
+        )
+
+    optional_entries = [
+        content_entry
+        for content_entry in CONTENT_ENTRIES
+        if content_entry.type not in ALWAYS_AVAILABLE_TYPES
+    ]
+
+    with http_session() as session, ThreadPoolExecutor(
+        max_workers=len(optional_entries)
+    ) as executor:
+        session.mount("https://", HTTPAdapter(pool_maxsize=len(optional_entries)))
+        futures = {
+            content_entry: executor.submit(
+                session.head, content_entry.build_url(gfycat_id)
+            )
+            for content_entry in optional_entries
+        }
 
-    with http_session() as session:
         for content_entry in CONTENT_ENTRIES:
-            content_url = content_entry.url_template.format(id=gfycat_id)
-            response = session.head(content_url)
+            if content_entry.type in ALWAYS_AVAILABLE_TYPES:
+                yield _build_content(content_entry, 0)
+
+        for content_entry, future in futures.items():
+            response = future.result()
             if not response.ok:
                 log.warning(
-                    f"Content entry {content_entry!r} doesn't appear to exist for "
-                    f"gfycat {gfycat_id!r}, skipping content entry"
+                    "Content entry {!r} doesn't appear to exist for gfycat {!r}, "
+                    "skipping content entry",
+                    content_entry,
+                    gfycat_id,
                 )
                 continue
 
-            yield Content(
-                id=build_content_id(gfycat_id),
-                name=content_entry.name,
-                url=url.url,
-                size=int(response.headers.get("content-length", 0)),
-                type=content_entry.mimetype,
-                extension=content_entry.extension,
-                quality=content_entry.quality,
-                resources=[HttpResource(method=HttpMethod.GET, url=content_url)],
-                meta=gfycat_meta,
+            yield _build_content(
+                content_entry, int(response.headers.get("content-length", 0))
             )
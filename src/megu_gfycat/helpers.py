@@ -5,13 +5,22 @@
 """Contains helper functions that the plugins can use freely."""
 
 import os
-from typing import Generator, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Generator, Iterable, List, Optional, Tuple
 
 from megu import Content, Url
 from megu.log import instance as log
 
+from .api import get_bearer_token
 from .api import iter_content as iter_gfycat_content
-from .constants import ENV_API_ENABLED, ENV_API_SECRET, ENV_API_TOKEN, VALID_PATTERNS
+from .constants import (
+    DEFAULT_MAX_WORKERS,
+    ENV_API_ENABLED,
+    ENV_API_SECRET,
+    ENV_API_TOKEN,
+    TRUTHY_VALUES,
+    URL_PATTERN,
+)
 from .guesswork import iter_content as iter_guessed_content
 
 
@@ -27,12 +36,15 @@ def get_url_id(url: Url) -> Optional[str]:
             The discovered gfycat internal ID if found.
     """
 
-    for pattern in VALID_PATTERNS:
-        url_match = pattern.match(url.url)
-        if url_match:
-            return url_match.groupdict().get("id", None)
+    # cheap substring check to skip the regex for URLs that obviously aren't gfycat
+    if "gfycat.com" not in url.url:
+        return None
+
+    url_match = URL_PATTERN.fullmatch(url.url)
+    if url_match is None:
+        return None
 
-    return None
+    return url_match.group("basic_id") or url_match.group("raw_id")
 
 
 def is_known_url(url: Url) -> bool:
@@ -60,6 +72,8 @@ def is_api_enabled() -> bool:
 
         - ``1``
         - ``true``
+        - ``yes``
+        - ``on``
 
     Returns:
         bool:
@@ -67,7 +81,7 @@ def is_api_enabled() -> bool:
             otherwise False.
     """
 
-    return os.getenv(ENV_API_ENABLED, "").lower() in ("1", "true")
+    return os.environ.get(ENV_API_ENABLED, "").lower() in TRUTHY_VALUES
 
 
 def get_api_tokens() -> Optional[Tuple[str, str]]:
@@ -108,7 +122,7 @@ def get_content_iterator(url: Url) -> Generator[Content, None, None]:
     """
 
     if is_api_enabled():
-        log.debug(f"Using the API logic for fetching Gfycat items for {url}")
+        log.debug("Using the API logic for fetching Gfycat items for {}", url)
         api_tokens = get_api_tokens()
         if api_tokens is None:
             raise RuntimeError(
@@ -118,5 +132,50 @@ def get_content_iterator(url: Url) -> Generator[Content, None, None]:
 
         return iter_gfycat_content(url, *api_tokens)
     else:
-        log.debug(f"Using the guesswork logic for fetching Gfycat items for {url}")
+        log.debug("Using the guesswork logic for fetching Gfycat items for {}", url)
         return iter_guessed_content(url)
+
+
+def iter_many_content(
+    urls: Iterable[Url], max_workers: int = DEFAULT_MAX_WORKERS
+) -> Generator[Content, None, None]:
+    """Iterate over the content for many URLs, extracting them concurrently.
+
+    Content is yielded grouped by URL in the same order the URLs were given.
+    URLs that fail to extract (due to a :class:`ValueError` or :class:`OSError`, which
+    includes any request failures) are logged and skipped without affecting the
+    content of the other URLs.
+
+    Args:
+        urls (Iterable[~megu.Url]):
+            The Urls the user passed through the plugin.
+        max_workers (int, optional):
+            The maximum number of URLs to extract at once.
+            Defaults to :data:`~.constants.DEFAULT_MAX_WORKERS`.
+
+    Raises:
+        RuntimeError:
+            If the API logic path is enabled but no token or secret is defined.
+
+    Yields:
+        ~megu.Content:
+            Content discovered for each of the given URLs.
+    """
+
+    if is_api_enabled():
+        api_tokens = get_api_tokens()
+        if api_tokens is not None:
+            # fetch the bearer token once up front so workers don't all request one
+            log.debug("Fetching OAuth token before extracting many Gfycat items")
+            get_bearer_token(*api_tokens)
+
+    def _extract(url: Url) -> List[Content]:
+        try:
+            return list(get_content_iterator(url))
+        except (ValueError, OSError) as exc:
+            log.warning("Failed to extract content from {}, skipping, {!r}", url, exc)
+            return []
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for content_list in executor.map(_extract, urls):
+            yield from content_list
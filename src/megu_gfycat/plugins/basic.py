@@ -5,11 +5,11 @@
 """Contains the basic gfycat.com Megu plugin."""
 
 from pathlib import Path
-from typing import Generator
+from typing import Generator, Iterable
 
 from megu import BasePlugin, Content, Manifest, Url
 
-from ..helpers import get_content_iterator, is_known_url
+from ..helpers import get_content_iterator, is_known_url, iter_many_content
 
 
 class GfycatBasicPlugin(BasePlugin):
@@ -51,6 +51,28 @@ class GfycatBasicPlugin(BasePlugin):
 
         yield from get_content_iterator(url)
 
+    def extract_content_many(
+        self, urls: Iterable[Url]
+    ) -> Generator[Content, None, None]:
+        """Extract Gfycat content from many URLs concurrently.
+
+        .. note::
+            This is not part of megu's :class:`~megu.BasePlugin` interface, so megu
+            itself never calls it (``megu get`` still extracts through
+            :meth:`extract_content`). It is only available to callers using this
+            plugin directly. URLs that fail to extract are logged and skipped.
+
+        Args:
+            urls (Iterable[~megu.Url]):
+                The Urls the user requested to download content from.
+
+        Yields:
+            ~megu.Content:
+                Any content the plugin discovers, grouped by URL in the given order.
+        """
+
+        yield from iter_many_content(urls)
+
     def merge_manifest(self, manifest: Manifest, to_path: Path) -> Path:
         """Merge the downloaded artifacts from the given manifest to the desired path.
 